@@ -2,18 +2,184 @@
 Base agent class for the multi-agent storyboard system.
 """
 
+import asyncio
+import hashlib
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from abc import ABC, abstractmethod
-from typing import AsyncGenerator, Optional, Dict, Any
+from typing import AsyncGenerator, Optional, Dict, Any, List, Tuple, Union, Callable, Generic, TypeVar
 from dataclasses import dataclass, field
 
-from models.schemas import AgentEvent, AgentName, Storyboard, MasterPlan
+import orjson
+
+from config import settings
+from models.schemas import AgentEvent, AgentEventType, AgentName, Storyboard, MasterPlan, RAGResult
 from services.llm import LLMService, get_llm_service
 from memory.tme import TaskMemoryEngine, get_tme_service
 from rag.retriever import RAGRetriever, get_rag_service
 from prompts.dynamic_prompt_builder import DynamicPromptBuilder, get_prompt_builder
 
 
-@dataclass
+T = TypeVar("T")
+
+# Event type lookup table (values and members both resolve here)
+_EVENT_TYPE_CACHE: Dict[str, AgentEventType] = {e.value: e for e in AgentEventType}
+
+
+class _Memoize(Generic[T]):
+    """
+    Thread-safe supplier that calls its factory at most once.
+    
+    The first call resolves the value under a lock; every later call is a
+    plain attribute read.
+    """
+    
+    __slots__ = ("_factory", "_value", "_lock")
+    
+    def __init__(self, factory: Callable[[], T], value: Optional[T] = None):
+        self._value = value
+        self._factory = factory if value is None else None
+        self._lock = threading.Lock()
+    
+    def __call__(self) -> T:
+        if self._factory is None:
+            return self._value
+        with self._lock:
+            if self._factory is not None:
+                self._value = self._factory()
+                self._factory = None
+        return self._value
+
+
+class _TTLCache:
+    """Small LRU cache whose entries also expire after a fixed TTL."""
+    
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+    
+    def get(self, key: Any) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+    
+    def set(self, key: Any, value: Any) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+
+# RAG results shared by all agents, keyed by
+# (retriever revision, query digest, domain, n_results)
+_rag_cache = _TTLCache(
+    maxsize=settings.rag_cache_max_entries,
+    ttl=settings.rag_cache_ttl_seconds
+)
+
+# Characters that matter when scanning for a balanced JSON object / array
+_JSON_TOKEN_RES = {
+    "{": re.compile(r'[{}"\\]'),
+    "[": re.compile(r'[\[\]"\\]'),
+}
+# What may precede a JSON value the LLM was told to output on its own
+_JSON_PREAMBLE_RE = re.compile(r"\s*(?:```[a-zA-Z]*\s*)?")
+
+
+class JsonValueScanner:
+    """
+    Incremental scan for the end of the first top-level JSON object/array.
+    
+    Text can be fed in chunks as it streams. Brackets inside string
+    literals (including escaped quotes) are skipped, so only the real
+    closing bracket ends the value; anything before the first opening
+    bracket is ignored.
+    """
+    
+    __slots__ = ("open_char", "close_char", "start", "end", "_pattern", "_offset", "_skip", "_depth", "_in_string")
+    
+    def __init__(self, open_char: str = "{", close_char: str = "}"):
+        self.open_char = open_char
+        self.close_char = close_char
+        self.start = -1  # Offset of the opening bracket
+        self.end = -1    # Offset just past the closing bracket
+        self._pattern = _JSON_TOKEN_RES[open_char]
+        self._offset = 0
+        self._skip = -1  # Offset of a backslash-escaped character
+        self._depth = 0
+        self._in_string = False
+    
+    def feed(self, chunk: str) -> bool:
+        """
+        Scan the next piece of text.
+        
+        Args:
+            chunk: Text following everything fed so far
+            
+        Returns:
+            bool: True on the call in which the value closes
+        """
+        if self.end >= 0:
+            return False
+        offset = self._offset
+        self._offset += len(chunk)
+        pos = 0
+        if self.start < 0:
+            pos = chunk.find(self.open_char)
+            if pos < 0:
+                return False
+            self.start = offset + pos
+        for match in self._pattern.finditer(chunk, pos):
+            at = offset + match.start()
+            if at == self._skip:
+                continue
+            char = match.group()
+            if self._in_string:
+                if char == "\\":
+                    self._skip = at + 1
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == self.open_char:
+                self._depth += 1
+            elif char == self.close_char:
+                self._depth -= 1
+                if self._depth == 0:
+                    self.end = at + 1
+                    return True
+        return False
+
+
+
+def _leads_with_json(text: str, scanner: JsonValueScanner) -> bool:
+    """
+    Check that the value the scanner just closed opens text and parses.
+    
+    Only a value at the start of the output (optionally after a code fence)
+    counts - a stray bracket pair in prose before the payload must not end
+    the stream.
+    """
+    if not _JSON_PREAMBLE_RE.fullmatch(text, 0, scanner.start):
+        return False
+    try:
+        orjson.loads(text[scanner.start:scanner.end])
+    except orjson.JSONDecodeError:
+        return False
+    return True
+
+
+@dataclass(slots=True)
 class AgentContext:
     """
     Context object passed between agents containing all necessary data.
@@ -25,15 +191,58 @@ class AgentContext:
     storyboard: Optional[Storyboard] = None
     current_scene_index: int = 0
     metadata: Dict[str, Any] = field(default_factory=dict)
+    _dump_cache: Dict[str, Tuple[Any, Tuple, Dict[str, Any]]] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+    _query_embeddings: Dict[bytes, List[float]] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+    _query_lower: Optional[Tuple[str, str]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    
+    @property
+    def query_lower(self) -> str:
+        """Lowercased query, computed once per query value."""
+        cached = self._query_lower
+        if cached is None or cached[0] is not self.query:
+            cached = (self.query, self.query.lower())
+            self._query_lower = cached
+        return cached[1]
+    
+    def _cached_dump(self, key: str, model: Any, version: Tuple = ()) -> Optional[Dict[str, Any]]:
+        """
+        Return model.model_dump(), reusing the previous dump while the same
+        object (and version stamp) is attached to the context.
+        """
+        if model is None:
+            self._dump_cache.pop(key, None)
+            return None
+        cached = self._dump_cache.get(key)
+        if cached is not None and cached[0] is model and cached[1] == version:
+            return cached[2]
+        dumped = model.model_dump()
+        self._dump_cache[key] = (model, version, dumped)
+        return dumped
     
     def to_dict(self) -> Dict[str, Any]:
-        """Convert context to dictionary."""
+        """
+        Convert context to dictionary.
+        
+        Plan and storyboard dumps are cached per object; the storyboard dump
+        is refreshed when its scene count, status or updated_at changes.
+        Treat the returned nested dicts as read-only.
+        """
+        storyboard_version = (
+            (len(self.storyboard.scenes), self.storyboard.status, self.storyboard.updated_at)
+            if self.storyboard else ()
+        )
         return {
             "session_id": self.session_id,
             "domain": self.domain,
             "query": self.query,
-            "master_plan": self.master_plan.model_dump() if self.master_plan else None,
-            "storyboard": self.storyboard.model_dump() if self.storyboard else None,
+            "master_plan": self._cached_dump("master_plan", self.master_plan),
+            "storyboard": self._cached_dump("storyboard", self.storyboard, storyboard_version),
             "current_scene_index": self.current_scene_index,
             "metadata": self.metadata
         }
@@ -66,38 +275,53 @@ class BaseAgent(ABC):
             rag_service: RAG retriever instance
             prompt_builder: Dynamic prompt builder instance
         """
-        self._llm_service = llm_service
-        self._tme_service = tme_service
-        self._rag_service = rag_service
-        self._prompt_builder = prompt_builder
+        self._llm_supplier = _Memoize(get_llm_service, llm_service)
+        self._tme_supplier = _Memoize(get_tme_service, tme_service)
+        self._rag_supplier = _Memoize(get_rag_service, rag_service)
+        self._prompt_builder_supplier = _Memoize(get_prompt_builder, prompt_builder)
+        self._name_cached = self.name
     
     @property
     def llm(self) -> LLMService:
         """Get LLM service, lazy loading if needed."""
-        if self._llm_service is None:
-            self._llm_service = get_llm_service()
-        return self._llm_service
+        return self._llm_supplier()
     
     @property
     def tme(self) -> TaskMemoryEngine:
         """Get TME service, lazy loading if needed."""
-        if self._tme_service is None:
-            self._tme_service = get_tme_service()
-        return self._tme_service
+        return self._tme_supplier()
     
     @property
     def rag(self) -> RAGRetriever:
         """Get RAG service, lazy loading if needed."""
-        if self._rag_service is None:
-            self._rag_service = get_rag_service()
-        return self._rag_service
+        return self._rag_supplier()
     
     @property
     def prompt_builder(self) -> DynamicPromptBuilder:
         """Get prompt builder, lazy loading if needed."""
-        if self._prompt_builder is None:
-            self._prompt_builder = get_prompt_builder()
-        return self._prompt_builder
+        return self._prompt_builder_supplier()
+    
+    @classmethod
+    async def preload(cls) -> None:
+        """
+        Construct the shared LLM, TME, RAG and prompt builder services and
+        seed the RAG store with the built-in domain content.
+        
+        Call once at application startup so the first agent run does not
+        pay the cold-start cost of building them. TME and RAG both open a
+        Chroma client on the same persist directory, so they are built one
+        after the other in a single worker thread.
+        """
+        def build_chroma_services() -> RAGRetriever:
+            get_tme_service()
+            return get_rag_service()
+        
+        _, rag, _ = await asyncio.gather(
+            asyncio.to_thread(get_llm_service),
+            asyncio.to_thread(build_chroma_services),
+            asyncio.to_thread(get_prompt_builder)
+        )
+        await rag.initialize_domain_content()
     
     @property
     @abstractmethod
@@ -120,7 +344,7 @@ class BaseAgent(ABC):
     
     def create_event(
         self,
-        event_type: str,
+        event_type: Union[AgentEventType, str],
         content: str,
         metadata: Optional[Dict[str, Any]] = None
     ) -> AgentEvent:
@@ -128,26 +352,135 @@ class BaseAgent(ABC):
         Create an agent event.
         
         Args:
-            event_type: Type of event
+            event_type: Type of event (member or its string value)
             content: Event content
             metadata: Optional metadata
             
         Returns:
             AgentEvent: Created event
         """
-        from models.schemas import AgentEventType
+        if not isinstance(event_type, AgentEventType):
+            event_type = _EVENT_TYPE_CACHE.get(event_type) or AgentEventType(event_type)
         return AgentEvent(
-            agent=self.name,
-            event=AgentEventType(event_type),
+            agent=self._name_cached,
+            event=event_type,
             content=content,
             metadata=metadata
         )
     
+    async def stream_llm(
+        self,
+        session_id: str,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+        json_close: Optional[str] = None
+    ) -> AsyncGenerator[str, None]:
+        """
+        Stream an LLM generation that is aborted if the caller goes away.
+        
+        If the consuming task is cancelled or the generator is closed early,
+        the underlying stream is aborted instead of generating into the void,
+        and its concurrency slot is released before this generator returns.
+        
+        With json_close set ("}" or "]"), the stream ends as soon as the
+        first top-level JSON object/array closes and parses, instead of
+        running on through trailing prose until max_tokens. The close is
+        found with a string-aware JsonValueScanner, and only a value that
+        opens the output (optionally after a code fence) ends it early.
+        
+        Args:
+            session_id: Session identifier (prefix of the request ID)
+            prompt: User prompt
+            system_prompt: Optional system prompt
+            temperature: Override default temperature
+            max_tokens: Override default max tokens
+            response_format: Response format (e.g., {"type": "json_object"})
+            json_close: Closing bracket of the expected JSON value, if any
+            
+        Yields:
+            str: Text chunks as they are generated, the last one ending at
+                the JSON value if cut off early
+        """
+        json_open = {"}": "{", "]": "["}.get(json_close)
+        scanner = JsonValueScanner(json_open, json_close) if json_open else None
+        parts: List[str] = []
+        consumed = 0
+        request_id = f"{session_id}:{uuid.uuid4().hex}"
+        stream = self.llm.generate_stream(
+            prompt=prompt,
+            system_prompt=system_prompt,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            request_id=request_id,
+            response_format=response_format
+        )
+        try:
+            async for chunk in stream:
+                if scanner is not None and scanner.end < 0:
+                    parts.append(chunk)
+                    if scanner.feed(chunk) and _leads_with_json("".join(parts), scanner):
+                        yield chunk[:scanner.end - consumed]
+                        return
+                consumed += len(chunk)
+                yield chunk
+        finally:
+            # abort() drops the HTTP stream right away; aclose() then runs
+            # generate_stream's cleanup, which returns its semaphore permit
+            await self.llm.abort(request_id)
+            await stream.aclose()
+    
+    async def collect_llm(
+        self,
+        session_id: str,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        json_close: Optional[str] = None
+    ) -> str:
+        """
+        Run stream_llm to completion and return the joined text.
+        
+        With json_close set ("}" or "]"), generation is cut off as soon as
+        the first top-level JSON object/array closes and parses (see
+        stream_llm).
+        
+        Args:
+            session_id: Session identifier (prefix of the request ID)
+            prompt: User prompt
+            system_prompt: Optional system prompt
+            temperature: Override default temperature
+            max_tokens: Override default max tokens
+            json_close: Closing bracket of the expected JSON value, if any
+            
+        Returns:
+            str: Generated text, ending at the JSON value if cut off early
+        """
+        parts: List[str] = []
+        stream = self.stream_llm(
+            session_id,
+            prompt=prompt,
+            system_prompt=system_prompt,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            json_close=json_close
+        )
+        try:
+            async for chunk in stream:
+                parts.append(chunk)
+        finally:
+            await stream.aclose()
+        return "".join(parts)
+    
     async def get_memory_context(
         self,
         session_id: str,
         query: str,
-        n_results: int = 5
+        n_results: int = 5,
+        query_embedding: Optional[List[float]] = None
     ) -> str:
         """
         Get relevant memory context for a query.
@@ -156,6 +489,7 @@ class BaseAgent(ABC):
             session_id: Session identifier
             query: Context query
             n_results: Number of results
+            query_embedding: Precomputed embedding of query
             
         Returns:
             str: Formatted memory context
@@ -163,23 +497,21 @@ class BaseAgent(ABC):
         memories = await self.tme.query_memories(
             session_id=session_id,
             query=query,
-            n_results=n_results
+            n_results=n_results,
+            query_embedding=query_embedding
         )
         
         if not memories:
             return "No relevant context from previous scenes."
         
-        context_parts = []
-        for memory in memories:
-            context_parts.append(f"[{memory.memory_type}] {memory.content}")
-        
-        return "\n".join(context_parts)
+        return "\n".join([f"[{m.memory_type}] {m.content}" for m in memories])
     
     async def search_rag(
         self,
         query: str,
         domain: str,
-        n_results: int = 3
+        n_results: int = 3,
+        query_embedding: Optional[List[float]] = None
     ) -> str:
         """
         Search RAG for relevant content.
@@ -188,25 +520,103 @@ class BaseAgent(ABC):
             query: Search query
             domain: Domain to search in
             n_results: Number of results
+            query_embedding: Precomputed embedding of query
             
         Returns:
             str: Formatted RAG results
         """
+        results = await self.search_rag_results(query, domain, n_results, query_embedding)
+        return self._format_rag_results(results)
+    
+    async def search_rag_results(
+        self,
+        query: str,
+        domain: str,
+        n_results: int = 3,
+        query_embedding: Optional[List[float]] = None
+    ) -> List[RAGResult]:
+        """
+        Search RAG, reusing recent results for the same query.
+        
+        Results are cached across agents for RAG_CACHE_TTL_SECONDS, so repeated
+        queries within a pipeline skip the vector search. Empty results are not
+        cached, and documents added to the retriever invalidate every entry.
+        
+        Args:
+            query: Search query
+            domain: Domain to search in
+            n_results: Number of results
+            query_embedding: Precomputed embedding of query
+            
+        Returns:
+            List[RAGResult]: Matching documents (shared - do not mutate)
+        """
+        key = (
+            self.rag.revision,
+            hashlib.blake2b(query.encode(), digest_size=16).digest(),
+            domain,
+            n_results
+        )
+        cached = _rag_cache.get(key)
+        if cached is not None:
+            return cached
+        
         results = await self.rag.search(
             query=query,
             domain=domain,
-            n_results=n_results
+            n_results=n_results,
+            query_embedding=query_embedding
         )
         
+        if results:
+            _rag_cache.set(key, results)
+        return results
+    
+    def _format_rag_results(self, results: List[RAGResult]) -> str:
+        """Format RAG results for inclusion in a prompt."""
         if not results:
             return "No relevant domain knowledge found."
         
-        result_parts = []
-        for r in results:
-            source = r.source or "unknown"
-            result_parts.append(f"[Source: {source}]\n{r.content}")
+        return "\n\n".join([f"[Source: {r.source or 'unknown'}]\n{r.content}" for r in results])
+    
+    @staticmethod
+    def _lead_with_instructional_designer(skills: List[Any]) -> List[Any]:
+        """
+        Return skills with "Instructional Designer" first and duplicates removed.
         
-        return "\n\n".join(result_parts)
+        Falls back to a plain prepend when the LLM returned unhashable
+        entries (e.g. skill objects instead of names).
+        """
+        try:
+            return list(dict.fromkeys(["Instructional Designer", *skills]))
+        except TypeError:
+            return ["Instructional Designer", *(s for s in skills if s != "Instructional Designer")]
+    
+    async def embed(
+        self,
+        text: str,
+        context: Optional[AgentContext] = None
+    ) -> List[float]:
+        """
+        Embed text, reusing a previous embedding cached on the context.
+        
+        Args:
+            text: Text to embed
+            context: Optional agent context holding the embedding cache
+            
+        Returns:
+            List[float]: Embedding vector (empty if embedding failed)
+        """
+        if context is None:
+            return await self.llm.get_embedding(text)
+        
+        key = hashlib.blake2b(text.encode(), digest_size=16).digest()
+        embedding = context._query_embeddings.get(key)
+        if embedding is None:
+            embedding = await self.llm.get_embedding(text)
+            if embedding:
+                context._query_embeddings[key] = embedding
+        return embedding
     
     async def update_memory(
         self,
@@ -218,6 +628,8 @@ class BaseAgent(ABC):
         """
         Update memory with new information.
         
+        The write is awaited, so a read right after it sees the memory.
+        
         Args:
             session_id: Session identifier
             content: Memory content
@@ -230,4 +642,3 @@ class BaseAgent(ABC):
             memory_type=memory_type,
             tags=tags or []
         )
-
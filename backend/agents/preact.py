@@ -1911,15 +1911,27 @@ AGGRESSIVE CHANGES:
 6. Remove all unnecessary processing
 """
 
-from typing import AsyncGenerator, Optional, Dict, Any, List
-import json
+from typing import AsyncGenerator, Optional, Dict, Any, List, Sequence, Tuple
 import re
 import uuid
 import asyncio
-from datetime import datetime
+import hashlib
+import time
+from datetime import datetime, timedelta
+from functools import lru_cache
+from types import MappingProxyType
 
-from .base import BaseAgent, AgentContext
+import numpy as np
+import orjson
+
+try:
+    import ahocorasick
+except ImportError:  # pragma: no cover - regex fallback below
+    ahocorasick = None
+
+from .base import BaseAgent, AgentContext, JsonValueScanner
 from models.schemas import AgentEvent, AgentName, AgentEventType, MasterPlan
+from config import settings
 
 # Simplified domain patterns (top keywords only)
 DOMAIN_PATTERNS = {
@@ -1934,6 +1946,88 @@ DOMAIN_PATTERNS = {
     "legal": ["legal", "law", "contract", "compliance"],
 }
 
+_DOMAIN_NAMES = list(DOMAIN_PATTERNS)
+# Keywords lowercased once so matching only has to lowercase the query
+_DOMAIN_KEYWORDS = [
+    list(dict.fromkeys(kw.lower() for kw in keywords))
+    for keywords in DOMAIN_PATTERNS.values()
+]
+# Reverse index keyword -> domain rank; the earlier domain wins on duplicates
+_KEYWORD_RANK: Dict[str, int] = {}
+for _rank, _keywords in enumerate(_DOMAIN_KEYWORDS):
+    for _keyword in _keywords:
+        _KEYWORD_RANK.setdefault(_keyword, _rank)
+
+
+def _build_domain_automaton() -> "ahocorasick.Automaton":
+    """
+    Build one Aho-Corasick automaton over every domain keyword.
+
+    Each keyword maps to the index of its domain in DOMAIN_PATTERNS, so a
+    single pass over the query yields every hit together with its priority.
+    """
+    automaton = ahocorasick.Automaton()
+    for keyword, rank in _KEYWORD_RANK.items():
+        automaton.add_word(keyword, rank)
+    automaton.make_automaton()
+    return automaton
+
+
+def _build_domain_regex() -> "re.Pattern[str]":
+    """
+    Compile every domain into one pattern, used when pyahocorasick is missing.
+
+    Each domain is a named group (domain keys are identifiers) inside a
+    zero-width lookahead, so finditer reports every position where a
+    keyword starts - overlapping hits included - and at each position the
+    first matching group is the highest-priority domain. Keywords match as
+    plain substrings, the same as the automaton.
+    """
+    groups = "|".join(
+        f"(?P<{domain}>{'|'.join(map(re.escape, keywords))})"
+        for domain, keywords in zip(_DOMAIN_NAMES, _DOMAIN_KEYWORDS)
+    )
+    return re.compile(f"(?=(?:{groups}))")
+
+
+_DOMAIN_AUTOMATON = _build_domain_automaton() if ahocorasick else None
+_DOMAIN_REGEX = None if ahocorasick else _build_domain_regex()
+_DOMAIN_RANK = {domain: rank for rank, domain in enumerate(_DOMAIN_NAMES)}
+
+
+# Longer queries (pasted documents) skip the memo so it cannot pin large strings
+_DOMAIN_CACHE_MAX_CHARS = 1024
+
+
+def _match_domain(query_lower: str) -> str:
+    """
+    Map a lowercased query to the first domain whose keywords it contains.
+
+    Both matchers scan in C; the automaton loop stops early once a hit for
+    the highest-priority domain is seen, which matters on long inputs.
+    """
+    if _DOMAIN_REGEX is not None:
+        hits = (_DOMAIN_RANK[m.lastgroup] for m in _DOMAIN_REGEX.finditer(query_lower))
+    else:
+        hits = (rank for _, rank in _DOMAIN_AUTOMATON.iter(query_lower))
+    best = None
+    for rank in hits:
+        if best is None or rank < best:
+            best = rank
+            if best == 0:
+                break
+    return "default" if best is None else _DOMAIN_NAMES[best]
+
+
+@lru_cache(maxsize=1024)
+def _detect_domain_cached(query_lower: str) -> str:
+    """
+    Memoized _match_domain, because refinements and retries re-run
+    detection on the same query text.
+    """
+    return _match_domain(query_lower)
+
+
 DOMAIN_SKILLS = {
     "healthcare": ["Clinical Trainer", "Medical Writer"],
     "finance": ["Financial Analyst", "Risk Assessor"],
@@ -1947,6 +2041,20 @@ DOMAIN_SKILLS = {
     "default": ["Content Creator", "Process Designer"],
 }
 
+# Final skill tuples per domain, "Instructional Designer" first and deduped
+_DOMAIN_SKILLS_FINAL = MappingProxyType({
+    domain: tuple(dict.fromkeys(["Instructional Designer", *skills[:2]]))
+    for domain, skills in DOMAIN_SKILLS.items()
+})
+
+# Planning-prompt head per domain, rendered once. Everything that is fixed
+# for a domain comes before the query so the system prompt plus this head
+# form a stable prefix the provider's prompt cache can reuse.
+_PLANNING_PROMPT_HEAD = {
+    domain: f"Domain: {domain}\nSkills: {orjson.dumps(skills[:2]).decode()}\n"
+    for domain, skills in _DOMAIN_SKILLS_FINAL.items()
+}
+
 DOMAIN_CAPABILITIES = {
     "healthcare": ["clinical_protocols", "patient_safety"],
     "finance": ["risk_assessment", "compliance"],
@@ -1960,8 +2068,107 @@ DOMAIN_CAPABILITIES = {
     "default": ["content_structure", "quality_guidelines"],
 }
 
+# Capabilities handed to plans per domain (top two), frozen once
+_DOMAIN_CAPABILITIES_FINAL = MappingProxyType({
+    domain: tuple(capabilities[:2]) for domain, capabilities in DOMAIN_CAPABILITIES.items()
+})
+
+# Static defaults for fields missing from the LLM's plan / step JSON
+_PLAN_DEFAULTS = {
+    "approach": "Step-by-step",
+    "steps": [],
+    "constraints": [],
+    "success_criteria": [],
+    "estimated_complexity": "moderate",
+}
+_STEP_DEFAULTS = {
+    "description": "",
+    "expected_output": "",
+    "sub_steps": [],
+    "estimated_effort": "15min",
+    "validation_criteria": [],
+    "priority": "important",
+}
+# Minutes per estimated_effort label; unknown labels count as 15
+_EFFORT_MINUTES = MappingProxyType({"5min": 5, "15min": 15, "30min": 30, "1hr": 60})
+
+# Plan flowchart: fixed header plus one node and one edge per step
+_MERMAID_TEMPLATE = "graph TD\n    START[Start] --> S1{body}"
+_MERMAID_STEP = '\n    S{n}["{n}. {title}"]\n    S{n} --> {next}'
+# Characters that would break a quoted Mermaid label, mapped to safe look-alikes
+_MERMAID_ESCAPE = str.maketrans({'"': "'", "<": "‹", ">": "›", "[": "(", "]": ")", "|": "/"})
+
+# Queries of at most this many words without any of these words get the
+# default plan, no LLM call (only when settings.preact_trivial_fast_path is on).
+# Keywords match at a word start, so "planning" counts but "explain" does not
+_TRIVIAL_QUERY_MAX_WORDS = 7
+_HEAVY_QUERY_RE = re.compile(
+    r"\b(?:plan|design|build|create|develop|course|curriculum|architecture|strategy"
+    r"|storyboard|module|training|program)"
+)
+
+# Audience skill-level cues, matched in one pass; any beginner cue wins
+_SKILL_LEVEL_RE = re.compile(
+    r"(?=(?P<beginner>beginner|intro|basic)|(?P<advanced>advanced|expert|complex))"
+)
+
+# Naive UTC epoch, matching the datetime.utcnow() strings used elsewhere
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _find_json(text: str) -> Optional[Tuple[int, int]]:
+    """
+    Locate the first balanced top-level JSON object in text.
+
+    Single forward pass that tracks brace depth and skips braces inside
+    string literals, so trailing prose after the object is ignored and
+    nothing is backtracked.
+
+    Args:
+        text: Raw LLM response
+
+    Returns:
+        (start, end) slice bounds of the object, or None if none is closed
+    """
+    scanner = JsonValueScanner()
+    return (scanner.start, scanner.end) if scanner.feed(text) else None
+
+
+def _load_json(text: str) -> Any:
+    """
+    Parse the first top-level JSON object in text.
+
+    The plan stream stops right after the object closes, so the slice from
+    the first "{" to the last "}" is almost always exactly that object and
+    parses in one orjson call; _find_json's walk only runs when it does not.
+
+    Args:
+        text: Raw LLM response
+
+    Returns:
+        The decoded object, or None if no object parses
+    """
+    start, end = text.find("{"), text.rfind("}") + 1
+    if 0 <= start < end:
+        try:
+            return orjson.loads(text[start:end])
+        except orjson.JSONDecodeError:
+            pass
+    span = _find_json(text)
+    if span is None:
+        return None
+    try:
+        return orjson.loads(text[span[0]:span[1]])
+    except orjson.JSONDecodeError:
+        return None
+
 
 class ReasoningStep:
+    __slots__ = (
+        "step_number", "title", "description", "expected_output", "dependencies",
+        "sub_steps", "estimated_effort", "validation_criteria", "tools_needed", "priority",
+    )
+    
     def __init__(self, step_number: int, title: str, description: str, expected_output: str,
                  dependencies: List[int] = None, sub_steps: List[str] = None, 
                  estimated_effort: str = "15min", validation_criteria: List[str] = None,
@@ -1992,7 +2199,21 @@ class ReasoningStep:
         }
 
 
+# Fallback plan steps, identical for every request; shared read-only instances
+_DEFAULT_STEPS = (
+    ReasoningStep(1, "Analysis", "Analyze requirements", "Requirements", 
+                 sub_steps=["Review request", "Identify needs"], estimated_effort="15min", priority="critical"),
+    ReasoningStep(2, "Planning", "Create strategy", "Plan", 
+                 dependencies=[1], sub_steps=["Define approach", "Plan steps"], estimated_effort="15min", priority="critical"),
+    ReasoningStep(3, "Execution", "Generate content", "Output", 
+                 dependencies=[2], sub_steps=["Create content", "Add details"], estimated_effort="30min", priority="important"),
+    ReasoningStep(4, "Review", "Quality check", "Final output", 
+                 dependencies=[3], sub_steps=["Review", "Finalize"], estimated_effort="15min", priority="important"),
+)
+
 class ClarificationQuestion:
+    __slots__ = ("id", "question", "question_type", "options", "default", "priority", "reason")
+    
     def __init__(self, id: str, question: str, question_type: str = "boolean",
                  options: List[str] = None, default: str = None, 
                  priority: str = "medium", reason: str = None):
@@ -2017,6 +2238,14 @@ class ClarificationQuestion:
 
 
 class ReasoningPlan:
+    __slots__ = (
+        "title", "task_understanding", "approach", "steps", "constraints", "success_criteria",
+        "estimated_complexity", "detected_domain", "domain_skills", "domain_capabilities",
+        "template_id", "_created_at_ns", "_created_at", "clarification_questions",
+        "chat_history", "deep_analysis", "requirements", "risks_and_assumptions",
+        "strategy", "estimated_total_effort", "has_instructional_designer", "_dict_cache",
+    )
+    
     def __init__(self, title: str, task_understanding: str, approach: str, 
                  steps: List[ReasoningStep], constraints: List[str], 
                  success_criteria: List[str], estimated_complexity: str,
@@ -2033,9 +2262,11 @@ class ReasoningPlan:
         self.estimated_complexity = estimated_complexity
         self.detected_domain = detected_domain
         self.domain_skills = domain_skills or ["Instructional Designer"]
+        self.has_instructional_designer = "Instructional Designer" in self.domain_skills
         self.domain_capabilities = domain_capabilities or []
-        self.template_id = template_id or str(uuid.uuid4())
-        self.created_at = datetime.utcnow().isoformat()
+        self.template_id = template_id or str(uuid.uuid4())  # UUID v4, validated by ReFlect
+        self._created_at_ns = time.time_ns()
+        self._created_at: Optional[str] = None
         self.clarification_questions = clarification_questions or []
         self.chat_history = kwargs.get("chat_history", [])
         self.deep_analysis = kwargs.get("deep_analysis", {})
@@ -2043,40 +2274,184 @@ class ReasoningPlan:
         self.risks_and_assumptions = kwargs.get("risks_and_assumptions", {})
         self.strategy = kwargs.get("strategy", {})
         self.estimated_total_effort = self._calc_effort()
+        self._dict_cache: Optional[Dict[str, Any]] = None
+    
+    @property
+    def created_at(self) -> str:
+        """UTC creation time as an ISO string, formatted on first access"""
+        if self._created_at is None:
+            created = _EPOCH + timedelta(microseconds=self._created_at_ns // 1000)
+            self._created_at = created.isoformat()
+        return self._created_at
     
     def _calc_effort(self) -> str:
-        effort_map = {"5min": 5, "15min": 15, "30min": 30, "1hr": 60}
-        total = sum(effort_map.get(s.estimated_effort, 15) for s in self.steps)
+        minutes = _EFFORT_MINUTES.get
+        total = sum(minutes(s.estimated_effort, 15) for s in self.steps)
         return f"{total}min" if total < 60 else f"{total//60}hr"
     
     def to_dict(self) -> Dict[str, Any]:
-        return {
-            "title": self.title,
-            "task_understanding": self.task_understanding,
-            "approach": self.approach,
-            "steps": [s.to_dict() for s in self.steps],
-            "constraints": self.constraints,
-            "success_criteria": self.success_criteria,
-            "estimated_complexity": self.estimated_complexity,
-            "detected_domain": self.detected_domain,
-            "domain_skills": self.domain_skills,
-            "domain_capabilities": self.domain_capabilities,
-            "template_id": self.template_id,
-            "created_at": self.created_at,
-            "clarification_questions": [q.to_dict() for q in self.clarification_questions],
-            "chat_history": self.chat_history,
-            "deep_analysis": self.deep_analysis,
-            "requirements": self.requirements,
-            "risks_and_assumptions": self.risks_and_assumptions,
-            "strategy": self.strategy,
-            "estimated_total_effort": self.estimated_total_effort,
-            "metadata": {
-                "generated_by": "ultra-optimized-preact",
-                "includes_instructional_designer": "Instructional Designer" in self.domain_skills,
-                "analysis_depth": "ultra-fast"
+        """
+        Serialize the plan. Plans are not mutated once built, so the dict is
+        built on first call and the same object is returned afterwards.
+        """
+        if self._dict_cache is None:
+            self._dict_cache = {
+                "title": self.title,
+                "task_understanding": self.task_understanding,
+                "approach": self.approach,
+                "steps": [s.to_dict() for s in self.steps],
+                "constraints": self.constraints,
+                "success_criteria": self.success_criteria,
+                "estimated_complexity": self.estimated_complexity,
+                "detected_domain": self.detected_domain,
+                "domain_skills": self.domain_skills,
+                "domain_capabilities": self.domain_capabilities,
+                "template_id": self.template_id,
+                "created_at": self.created_at,
+                "clarification_questions": [q.to_dict() for q in self.clarification_questions],
+                "chat_history": self.chat_history,
+                "deep_analysis": self.deep_analysis,
+                "requirements": self.requirements,
+                "risks_and_assumptions": self.risks_and_assumptions,
+                "strategy": self.strategy,
+                "estimated_total_effort": self.estimated_total_effort,
+                "metadata": {
+                    "generated_by": "ultra-optimized-preact",
+                    "includes_instructional_designer": self.has_instructional_designer,
+                    "analysis_depth": "ultra-fast"
+                }
             }
-        }
+        return self._dict_cache
+
+
+
+# Words of a query that can carry its subject into a plan's step text
+_QUERY_TERM_RE = re.compile(r"[a-z0-9][a-z0-9+#]{3,}")
+_QUERY_STOPWORDS = frozenset((
+    "about", "also", "and", "could", "does", "each", "explain", "for", "from", "have",
+    "help", "into", "like", "make", "need", "please", "should", "some", "that", "their",
+    "them", "then", "there", "these", "this", "using", "want", "what", "when", "which",
+    "will", "with", "would", "your",
+))
+
+
+def _query_terms(query_lower: str) -> frozenset:
+    """Content words of a lowercased query"""
+    return frozenset(_QUERY_TERM_RE.findall(query_lower)) - _QUERY_STOPWORDS
+
 
+def _template_terms(plan: ReasoningPlan) -> frozenset:
+    """Words in the parts of a plan that _reuse_plan carries over"""
+    text = " ".join((
+        plan.approach,
+        *plan.constraints,
+        *plan.success_criteria,
+        *(f"{s.title} {s.description} {s.expected_output} {' '.join(s.sub_steps)}" for s in plan.steps),
+    ))
+    return frozenset(_QUERY_TERM_RE.findall(text.lower()))
+
+
+class _PlanTemplateCache:
+    """
+    Parsed plans keyed by (domain, skill level), matched by query similarity.
+    
+    Each key holds up to max_entries unit-normalized query embeddings; a
+    lookup returns the stored plan whose query has the highest cosine
+    similarity, provided it reaches the threshold. Exact repeats of a
+    query are also indexed by digest, so they hit without an embedding.
+    
+    A similar (not identical) query only reuses a plan whose reused text
+    (approach, constraints, criteria, steps) has no words of the original
+    query that the new query lacks, so one user's subject never shows up
+    in another user's plan.
+    """
+    
+    def __init__(self, max_entries: int, threshold: float):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self._vectors: Dict[Tuple[str, str], np.ndarray] = {}
+        # (plan, original query words that its reused text contains) per vector row
+        self._plans: Dict[Tuple[str, str], List[Tuple[ReasoningPlan, frozenset]]] = {}
+        self._exact: Dict[Tuple[str, str], Dict[bytes, ReasoningPlan]] = {}
+    
+    @staticmethod
+    def digest(query_lower: str) -> bytes:
+        return hashlib.blake2b(query_lower.strip().encode(), digest_size=16).digest()
+    
+    def lookup_exact(self, key: Tuple[str, str], digest: bytes) -> Optional[ReasoningPlan]:
+        exact = self._exact.get(key)
+        return exact.get(digest) if exact else None
+    
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+    
+    def lookup(self, key: Tuple[str, str], embedding: List[float],
+               query_lower: str) -> Optional[ReasoningPlan]:
+        vectors = self._vectors.get(key)
+        query = self._normalize(embedding)
+        if vectors is None or vectors.shape[1] != query.shape[0]:
+            # Empty key, or stored under a different embedding model - put() resets it
+            return None
+        scores = vectors @ query
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            return None
+        plan, used_terms = self._plans[key][best]
+        # Written around words this query does not share - regenerate
+        return plan if used_terms <= _query_terms(query_lower) else None
+    
+    def put(self, key: Tuple[str, str], embedding: List[float], plan: ReasoningPlan,
+            query_lower: str, digest: Optional[bytes] = None) -> None:
+        if digest is not None:
+            exact = self._exact.setdefault(key, {})
+            exact[digest] = plan
+            if len(exact) > self.max_entries:
+                del exact[next(iter(exact))]  # Oldest first (insertion order)
+        vector = self._normalize(embedding)[np.newaxis, :]
+        vectors = self._vectors.get(key)
+        plans = self._plans.setdefault(key, [])
+        entry = (plan, _query_terms(query_lower) & _template_terms(plan))
+        if vectors is None or vectors.shape[1] != vector.shape[1]:
+            # First entry, or the embedding model changed
+            self._vectors[key] = vector
+            plans[:] = [entry]
+            return
+        # Oldest entries drop off once the key is full
+        self._vectors[key] = np.vstack([vectors, vector])[-self.max_entries:]
+        plans.append(entry)
+        del plans[:-self.max_entries]
+
+
+@lru_cache(maxsize=256)
+def _render_steps(steps: Tuple[Tuple[int, str, str, str], ...]) -> Tuple[str, str]:
+    """
+    Summary step lines and mermaid diagram, built in one pass over the steps.
+
+    Keyed by step content - (step_number, title, estimated_effort,
+    description[:80]) per step - so the cache holds only the strings it
+    renders, and any plan with the same steps (cached templates, the
+    default plan, repeated LLM outlines) reuses the rendering.
+    """
+    summary_parts = []
+    mermaid_parts = []
+    last = len(steps) - 1
+    for i, (number, title, effort, description) in enumerate(steps):
+        summary_parts.append(f"**{number}. {title}** ({effort})\n{description}...\n\n")
+        mermaid_parts.append(_MERMAID_STEP.format(
+            n=number,
+            title=title.translate(_MERMAID_ESCAPE)[:20],
+            next=f"S{number + 1}" if i < last else "END[Done]"
+        ))
+    return "".join(summary_parts), _MERMAID_TEMPLATE.format(body="".join(mermaid_parts))
+
+
+_plan_cache = _PlanTemplateCache(
+    max_entries=settings.preact_plan_cache_max_entries,
+    threshold=settings.preact_plan_cache_threshold
+)
 
 class PreActAgent(BaseAgent):
     """
@@ -2108,34 +2483,44 @@ Output ONLY valid JSON, no explanations.
   "estimated_complexity": "moderate"
 }"""
 
+    # Emit a progress THOUGHT every N streamed characters
+    PROGRESS_EVERY_CHARS = 200
+
     @property
     def name(self) -> AgentName:
         return AgentName.PREACT
     
-    def _detect_domain(self, query: str) -> str:
-        """Ultra-fast domain detection"""
-        query_lower = query.lower()
-        for domain, keywords in DOMAIN_PATTERNS.items():
-            if any(kw in query_lower for kw in keywords):
-                return domain
-        return "default"
+    def _detect_domain(self, query: str, query_lower: Optional[str] = None) -> str:
+        """Ultra-fast domain detection (single automaton pass, memoized)"""
+        query_lower = query_lower or query.lower()
+        if len(query_lower) > _DOMAIN_CACHE_MAX_CHARS:
+            return _match_domain(query_lower)
+        return _detect_domain_cached(query_lower)
+    
+    def _get_domain_skills(self, domain: str) -> Sequence[str]:
+        # Shared immutable tuple - copy with list() if a mutable list is needed
+        return _DOMAIN_SKILLS_FINAL.get(domain, _DOMAIN_SKILLS_FINAL["default"])
     
-    def _get_domain_skills(self, domain: str) -> List[str]:
-        base = DOMAIN_SKILLS.get(domain, DOMAIN_SKILLS["default"])
-        return ["Instructional Designer"] + base[:2]  # Only top 2 skills
+    def _get_domain_capabilities(self, domain: str) -> Sequence[str]:
+        # Shared immutable tuple - copy with list() if a mutable list is needed
+        return _DOMAIN_CAPABILITIES_FINAL.get(domain, _DOMAIN_CAPABILITIES_FINAL["default"])
     
-    def _get_domain_capabilities(self, domain: str) -> List[str]:
-        return DOMAIN_CAPABILITIES.get(domain, DOMAIN_CAPABILITIES["default"])[:2]  # Only 2
+    def _is_trivial_query(self, query_lower: str) -> bool:
+        """Short request with no planning/build vocabulary - not worth an LLM plan"""
+        return (
+            len(query_lower.split(None, _TRIVIAL_QUERY_MAX_WORDS)) <= _TRIVIAL_QUERY_MAX_WORDS
+            and not _HEAVY_QUERY_RE.search(query_lower)
+        )
     
-    def _instant_analysis(self, query: str, domain: str) -> Dict[str, Any]:
+    def _instant_analysis(self, query: str, domain: str, query_lower: Optional[str] = None) -> Dict[str, Any]:
         """Instant heuristic analysis - no LLM"""
-        query_lower = query.lower()
+        query_lower = query_lower or query.lower()
         
         skill_level = "intermediate"
-        if any(w in query_lower for w in ["beginner", "intro", "basic"]):
-            skill_level = "beginner"
-        elif any(w in query_lower for w in ["advanced", "expert", "complex"]):
-            skill_level = "advanced"
+        for match in _SKILL_LEVEL_RE.finditer(query_lower):
+            skill_level = match.lastgroup
+            if skill_level == "beginner":
+                break
         
         return {
             "audience": {"primary": "General users", "skill_level": skill_level},
@@ -2150,83 +2535,147 @@ Output ONLY valid JSON, no explanations.
         yield self.create_event(AgentEventType.STATUS, "🚀 Ultra-fast mode...")
         
         # INSTANT: Domain detection
-        detected_domain = self._detect_domain(context.query)
+        detected_domain = self._detect_domain(context.query, context.query_lower)
         domain_skills = self._get_domain_skills(detected_domain)
         domain_capabilities = self._get_domain_capabilities(detected_domain)
+        effective_domain = detected_domain if context.domain in ["default", "general", ""] else context.domain
         
-        yield self.create_event(
-            AgentEventType.THOUGHT,
-            f"🎯 {detected_domain} | {len(domain_skills)} skills"
+        # With the plan cache on, the query is embedded once and the same
+        # vector serves both the RAG search and the cache lookup
+        embed_task = (
+            asyncio.create_task(self.embed(context.query, context))
+            if settings.preact_plan_cache_enabled else None
         )
         
-        context.metadata.update({
-            "detected_domain": detected_domain,
-            "domain_skills": domain_skills,
-            "domain_capabilities": domain_capabilities
-        })
-        
-        effective_domain = detected_domain if context.domain in ["default", "general", ""] else context.domain
+        async def search_rag():
+            # Shielded so a RAG timeout does not cancel the shared embedding
+            query_embedding = await asyncio.shield(embed_task) if embed_task is not None else None
+            return await self.search_rag_results(
+                query=context.query, domain=effective_domain, n_results=2,
+                query_embedding=query_embedding
+            )
         
-        # PARALLEL: RAG (with 2s timeout) + Instant analysis
+        # Start RAG (with 2s timeout) right away so it overlaps the events below
         async def quick_rag():
             try:
                 return await asyncio.wait_for(
-                    self.rag.search(query=context.query, domain=effective_domain, n_results=2),
+                    search_rag(),
                     timeout=2.0  # Only 2 seconds!
                 )
             except:
                 return None
         
-        rag_results, deep_analysis = await asyncio.gather(
-            quick_rag(),
-            asyncio.to_thread(self._instant_analysis, context.query, effective_domain)
+        rag_task = asyncio.create_task(quick_rag())
+        
+        yield self.create_event(
+            AgentEventType.THOUGHT,
+            f"🎯 {detected_domain} | {len(domain_skills)} skills"
         )
         
+        context.metadata.update({
+            "detected_domain": detected_domain,
+            "domain_skills": domain_skills,
+            "domain_capabilities": domain_capabilities
+        })
+        
+        # Heuristic analysis is microseconds - run inline while RAG is in flight
+        deep_analysis = self._instant_analysis(context.query, effective_domain, context.query_lower)
+        rag_results = await rag_task
+        
         domain_context = ""
         if rag_results:
             domain_context = "\n".join([r.content[:100] for r in rag_results[:1]])  # Only 1 result
         
         context.metadata["deep_analysis"] = deep_analysis
         
-        yield self.create_event(AgentEventType.THOUGHT, "📝 Generating plan...")
-        
-        # ULTRA-SHORT prompt
-        planning_prompt = f"""Domain: {detected_domain}
-Query: {context.query[:200]}
-Skills: {json.dumps(domain_skills[:2])}
+        # Similar earlier query in the same domain/skill level - reuse its plan
+        plan_cache_key = None
+        query_digest = None
+        query_embedding: List[float] = []
+        cached_plan = None
+        exact_hit = False
+        if embed_task is not None:
+            plan_cache_key = (detected_domain, deep_analysis["audience"]["skill_level"])
+            query_digest = _PlanTemplateCache.digest(context.query_lower)
+            cached_plan = _plan_cache.lookup_exact(plan_cache_key, query_digest)
+            exact_hit = cached_plan is not None
+            query_embedding = await embed_task  # Normally already done for RAG
+            if not query_embedding:
+                plan_cache_key = None
+            elif cached_plan is None:
+                cached_plan = _plan_cache.lookup(plan_cache_key, query_embedding, context.query_lower)
+        
+        if cached_plan is not None:
+            yield self.create_event(AgentEventType.THOUGHT, "♻️ Reusing cached plan template...")
+            reasoning_plan = self._reuse_plan(cached_plan, context, keep_title=exact_hit)
+        elif settings.preact_trivial_fast_path and self._is_trivial_query(context.query_lower):
+            yield self.create_event(AgentEventType.THOUGHT, "⚡ Simple request - using standard plan...")
+            reasoning_plan = self._default_plan(context)
+        else:
+            yield self.create_event(AgentEventType.THOUGHT, "📝 Generating plan...")
+            
+            # ULTRA-SHORT prompt - static domain head first, query last
+            planning_prompt = f"""{_PLANNING_PROMPT_HEAD.get(detected_domain, _PLANNING_PROMPT_HEAD["default"])}Query: {context.query[:200]}
 
 Create 4-5 step plan. JSON only."""
+            
+            # CRITICAL: Reduced tokens + lower temperature
+            parts: List[str] = []
+            streamed = 0
+            next_progress = self.PROGRESS_EVERY_CHARS
+            # Ends as soon as the top-level JSON object closes
+            stream = self.stream_llm(
+                context.session_id,
+                prompt=planning_prompt,
+                system_prompt=self.SYSTEM_PROMPT,
+                temperature=0.5,  # Lower = faster, more focused
+                max_tokens=1200,  # MUCH lower (was 1800)
+                response_format={"type": "json_object"} if settings.preact_json_mode else None,
+                json_close="}"
+            )
+            try:
+                async for chunk in stream:
+                    parts.append(chunk)
+                    streamed += len(chunk)
+            
+                    # Keep the client connection warm while the plan streams
+                    if streamed >= next_progress:
+                        next_progress = streamed + self.PROGRESS_EVERY_CHARS
+                        yield self.create_event(
+                            AgentEventType.THOUGHT,
+                            f"✍️ Drafting plan... {streamed} chars"
+                        )
+            finally:
+                await stream.aclose()  # Aborts the request if the run is closed early
+            
+            # Parse
+            full_response = "".join(parts)
+            reasoning_plan = self._try_parse_plan(full_response, context)
+            if reasoning_plan is None:
+                reasoning_plan = self._default_plan(context)
+            elif plan_cache_key is not None:
+                _plan_cache.put(
+                    plan_cache_key, query_embedding, reasoning_plan, context.query_lower, query_digest
+                )
         
-        # CRITICAL: Reduced tokens + lower temperature
-        full_response = ""
-        async for chunk in self.llm.generate_stream(
-            prompt=planning_prompt,
-            system_prompt=self.SYSTEM_PROMPT,
-            temperature=0.5,  # Lower = faster, more focused
-            max_tokens=1200   # MUCH lower (was 1800)
-        ):
-            full_response += chunk
-        
-        # Parse
-        reasoning_plan = self._parse_plan(full_response, context)
-        context.metadata["reasoning_plan"] = reasoning_plan.to_dict()
+        plan_dict = reasoning_plan.to_dict()  # Serialized once, shared below
+        context.metadata["reasoning_plan"] = plan_dict
         
         # Emit plan
-        for step in reasoning_plan.steps:
+        for step, step_dict in zip(reasoning_plan.steps, plan_dict["steps"]):
             yield self.create_event(
                 AgentEventType.ACTION,
                 f"Step {step.step_number}: {step.title}",
-                {"step": step.to_dict()}
+                {"step": step_dict}
             )
         
-        mermaid = self._gen_mermaid(reasoning_plan)
-        summary = self._format_summary(reasoning_plan)
+        summary, mermaid = self._render_plan(reasoning_plan)
         
         yield self.create_event(
             AgentEventType.PLAN,
             summary,
             {
-                "reasoning_plan": reasoning_plan.to_dict(),
+                "reasoning_plan": plan_dict,
                 "mermaid_diagram": mermaid,
                 "step_count": len(reasoning_plan.steps),
                 "complexity": reasoning_plan.estimated_complexity,
@@ -2265,75 +2714,96 @@ Create 4-5 step plan. JSON only."""
             {"ultra_optimized": True}
         )
     
-    def _parse_plan(self, response: str, context: AgentContext) -> ReasoningPlan:
-        """Fast parsing"""
+    def _try_parse_plan(self, response: str, context: AgentContext) -> Optional[ReasoningPlan]:
+        """Parse the LLM response into a plan, or None if it holds no usable JSON"""
         detected_domain = context.metadata.get("detected_domain", "default")
         domain_skills = context.metadata.get("domain_skills", ["Instructional Designer"])
         domain_capabilities = context.metadata.get("domain_capabilities", [])
         deep_analysis = context.metadata.get("deep_analysis", {})
         
-        json_match = re.search(r'\{[\s\S]*\}', response)
+        data = _load_json(response)
         
-        if json_match:
+        if data is not None:
             try:
-                data = json.loads(json_match.group())
+                # One merge per object instead of a .get() per field
+                plan = {
+                    **_PLAN_DEFAULTS,
+                    "title": f"{detected_domain} Plan",
+                    "task_understanding": context.query,
+                    "domain_skills": domain_skills,
+                    "domain_capabilities": domain_capabilities,
+                    **data
+                }
                 
                 steps = []
-                for i, s in enumerate(data.get("steps", [])[:5]):  # Max 5 steps
-                    steps.append(ReasoningStep(
-                        step_number=s.get("step_number", i + 1),
-                        title=s.get("title", f"Step {i + 1}"),
-                        description=s.get("description", "")[:100],  # Truncate
-                        expected_output=s.get("expected_output", "")[:80],
-                        sub_steps=s.get("sub_steps", [])[:2],  # Max 2 sub-steps
-                        estimated_effort=s.get("estimated_effort", "15min"),
-                        validation_criteria=s.get("validation_criteria", [])[:1],  # Max 1
-                        priority=s.get("priority", "important")
+                append_step, make_step = steps.append, ReasoningStep  # Local lookups in the loop
+                for i, s in enumerate(plan["steps"][:5]):  # Max 5 steps
+                    step = {**_STEP_DEFAULTS, "step_number": i + 1, "title": f"Step {i + 1}", **s}
+                    append_step(make_step(
+                        step_number=step["step_number"],
+                        title=step["title"],
+                        description=step["description"][:100],  # Truncate
+                        expected_output=step["expected_output"][:80],
+                        sub_steps=step["sub_steps"][:2],  # Max 2 sub-steps
+                        estimated_effort=step["estimated_effort"],
+                        validation_criteria=step["validation_criteria"][:1],  # Max 1
+                        priority=step["priority"]
                     ))
                 
-                skills = data.get("domain_skills", domain_skills)
-                if "Instructional Designer" not in skills:
-                    skills = ["Instructional Designer"] + skills
+                skills = self._lead_with_instructional_designer(plan["domain_skills"])
                 
                 return ReasoningPlan(
-                    title=data.get("title", f"{detected_domain} Plan")[:60],
-                    task_understanding=data.get("task_understanding", context.query)[:150],
-                    approach=data.get("approach", "Step-by-step")[:100],
+                    title=plan["title"][:60],
+                    task_understanding=plan["task_understanding"][:150],
+                    approach=plan["approach"][:100],
                     steps=steps,
-                    constraints=data.get("constraints", [])[:2],
-                    success_criteria=data.get("success_criteria", [])[:2],
-                    estimated_complexity=data.get("estimated_complexity", "moderate"),
+                    constraints=plan["constraints"][:2],
+                    success_criteria=plan["success_criteria"][:2],
+                    estimated_complexity=plan["estimated_complexity"],
                     detected_domain=detected_domain,
                     domain_skills=skills[:3],  # Max 3
-                    domain_capabilities=data.get("domain_capabilities", domain_capabilities)[:2],
+                    domain_capabilities=plan["domain_capabilities"][:2],
                     deep_analysis=deep_analysis
                 )
             except:
                 pass
         
-        return self._default_plan(context)
+        return None
+    
+    def _reuse_plan(self, cached: ReasoningPlan, context: AgentContext,
+                    keep_title: bool = False) -> ReasoningPlan:
+        """
+        New plan from a cached template, patched with this query's fields.
+        
+        The cached title was written for the original query, so it is only
+        kept for an exact repeat; otherwise it is regenerated like the
+        default plan's.
+        """
+        domain = context.metadata.get("detected_domain", cached.detected_domain)
+        return ReasoningPlan(
+            title=cached.title if keep_title else f"{domain.title()} Plan",
+            task_understanding=context.query[:150],
+            approach=cached.approach,
+            steps=cached.steps,
+            constraints=cached.constraints,
+            success_criteria=cached.success_criteria,
+            estimated_complexity=cached.estimated_complexity,
+            detected_domain=domain,
+            domain_skills=cached.domain_skills,
+            domain_capabilities=cached.domain_capabilities,
+            deep_analysis=context.metadata.get("deep_analysis", {})
+        )
     
     def _default_plan(self, context: AgentContext) -> ReasoningPlan:
         """Minimal default plan"""
         domain = context.metadata.get("detected_domain", "default")
         skills = context.metadata.get("domain_skills", ["Instructional Designer"])
         
-        steps = [
-            ReasoningStep(1, "Analysis", "Analyze requirements", "Requirements", 
-                         sub_steps=["Review request", "Identify needs"], estimated_effort="15min", priority="critical"),
-            ReasoningStep(2, "Planning", "Create strategy", "Plan", 
-                         dependencies=[1], sub_steps=["Define approach", "Plan steps"], estimated_effort="15min", priority="critical"),
-            ReasoningStep(3, "Execution", "Generate content", "Output", 
-                         dependencies=[2], sub_steps=["Create content", "Add details"], estimated_effort="30min", priority="important"),
-            ReasoningStep(4, "Review", "Quality check", "Final output", 
-                         dependencies=[3], sub_steps=["Review", "Finalize"], estimated_effort="15min", priority="important"),
-        ]
-        
         return ReasoningPlan(
             title=f"{domain.title()} Plan",
             task_understanding=context.query[:150],
             approach="Systematic execution",
-            steps=steps,
+            steps=list(_DEFAULT_STEPS),
             constraints=["Quality required"],
             success_criteria=["Requirements met"],
             estimated_complexity="moderate",
@@ -2342,20 +2812,10 @@ Create 4-5 step plan. JSON only."""
             domain_capabilities=context.metadata.get("domain_capabilities", [])
         )
     
-    def _gen_mermaid(self, plan: ReasoningPlan) -> str:
-        """Minimal mermaid"""
-        lines = ["graph TD", "    START[Start] --> S1"]
-        for i, step in enumerate(plan.steps):
-            lines.append(f'    S{step.step_number}["{step.step_number}. {step.title[:20]}"]')
-            if i < len(plan.steps) - 1:
-                lines.append(f"    S{step.step_number} --> S{step.step_number+1}")
-            else:
-                lines.append(f"    S{step.step_number} --> END[Done]")
-        return "\n".join(lines)
-    
-    def _format_summary(self, plan: ReasoningPlan) -> str:
-        """Compact summary"""
-        s = f"# {plan.title}\n\n**Domain:** {plan.detected_domain} | **Complexity:** {plan.estimated_complexity}\n\n## Steps\n"
-        for step in plan.steps:
-            s += f"**{step.step_number}. {step.title}** ({step.estimated_effort})\n{step.description[:80]}...\n\n"
-        return s
\ No newline at end of file
+    def _render_plan(self, plan: ReasoningPlan) -> Tuple[str, str]:
+        """Summary markdown and mermaid diagram; the step parts are memoized"""
+        steps_summary, mermaid = _render_steps(tuple(
+            (s.step_number, s.title, s.estimated_effort, s.description[:80]) for s in plan.steps
+        ))
+        header = f"# {plan.title}\n\n**Domain:** {plan.detected_domain} | **Complexity:** {plan.estimated_complexity}\n\n## Steps\n"
+        return header + steps_summary, mermaid
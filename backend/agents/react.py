@@ -27,15 +27,48 @@ Weaknesses: More tokens, slower, can hallucinate without constraints
 """
 
 from typing import AsyncGenerator, Optional, Dict, Any, List
-import json
 import re
 import uuid
 from datetime import datetime
 
+import orjson
+
 from .base import BaseAgent, AgentContext
 from models.schemas import AgentEvent, AgentName, AgentEventType, Scene
 from config import settings
 
+# Numbered-heading patterns for pulling scenes out of generated output
+_SCENE_HEADING_PATTERNS = (
+    re.compile(r"(?:Scene|Section|Part|Step)\s*(\d+)[:\s]+([^\n]+)", re.IGNORECASE),
+    re.compile(r"(\d+)\.\s+\*\*([^\*]+)\*\*", re.IGNORECASE),
+    re.compile(r"###\s*(\d+)[.:\s]+(.+)", re.IGNORECASE),
+)
+
+# THOUGHT / ACTION sections of a ReAct turn
+_THOUGHT_RE = re.compile(r"THOUGHT:\s*(.+?)(?=ACTION:|$)", re.IGNORECASE | re.DOTALL)
+_ACTION_RE = re.compile(r"ACTION:\s*(\w+)\s*[-:]\s*(.+?)(?=THOUGHT:|OBSERVATION:|$)", re.IGNORECASE | re.DOTALL)
+_ACTION_NAME_RE = re.compile(r"ACTION:\s*(\w+)", re.IGNORECASE)
+
+
+def _outer_json(text: str, open_char: str = "{", close_char: str = "}") -> Optional[str]:
+    """
+    Slice from the first opening bracket to the last closing one.
+    
+    Same span as the old greedy brace-to-brace regex, found with two C-level
+    scans instead of a backtracking regex over the whole LLM output.
+    
+    Args:
+        text: LLM output that should contain one JSON object or array
+        open_char: Opening bracket ("{" or "[")
+        close_char: Matching closing bracket
+        
+    Returns:
+        Optional[str]: The bracketed span, or None if there is none
+    """
+    start = text.find(open_char)
+    end = text.rfind(close_char)
+    return text[start:end + 1] if start != -1 and end > start else None
+
 
 class ReActAgent(BaseAgent):
     """
@@ -180,13 +213,12 @@ ACTION: FINAL_ANSWER -
             )
             
             # Generate next step
-            response = ""
-            async for chunk in self.llm.generate_stream(
+            response = await self.collect_llm(
+                context.session_id,
                 prompt=prompt,
                 system_prompt=self.SYSTEM_PROMPT,
                 temperature=0.7
-            ):
-                response += chunk
+            )
             
             # Parse the response
             thought, action, action_input = self._parse_response(response)
@@ -347,7 +379,7 @@ ACTION: FINAL_ANSWER -
         detected_domain = reasoning_plan.get('detected_domain', context.domain)
         
         # Check if this is a template generation task
-        is_template_task = self._is_template_task(context.query)
+        is_template_task = self._is_template_task(context.query, context.query_lower)
         
         # Base context for all tasks
         base_context = f"""## TASK
@@ -396,7 +428,7 @@ Your final output must follow this structure:
             return base_context + template_context
         else:
             # Detect content type for specific guidance
-            query_lower = context.query.lower()
+            query_lower = context.query_lower
             is_course = any(w in query_lower for w in ['course', 'curriculum', 'lesson', 'module', 'training'])
             is_analysis = any(w in query_lower for w in ['analysis', 'analyze', 'research', 'study'])
             
@@ -444,13 +476,13 @@ Do NOT create another plan. CREATE the actual content.
 """
             return base_context + output_guidance
     
-    def _is_template_task(self, query: str) -> bool:
+    def _is_template_task(self, query: str, query_lower: Optional[str] = None) -> bool:
         """Check if the query is asking for template generation."""
         template_keywords = [
             "template", "json template", "domain template", "generate template",
             "create template", "build template", "schema", "json schema"
         ]
-        query_lower = query.lower()
+        query_lower = query_lower or query.lower()
         return any(kw in query_lower for kw in template_keywords)
     
     def _build_iteration_prompt(
@@ -501,18 +533,18 @@ Format it professionally with headings and sections."""
         action_input = ""
         
         # Extract THOUGHT
-        thought_match = re.search(r"THOUGHT:\s*(.+?)(?=ACTION:|$)", response, re.IGNORECASE | re.DOTALL)
+        thought_match = _THOUGHT_RE.search(response)
         if thought_match:
             thought = thought_match.group(1).strip()
         
         # Extract ACTION
-        action_match = re.search(r"ACTION:\s*(\w+)\s*[-:]\s*(.+?)(?=THOUGHT:|OBSERVATION:|$)", response, re.IGNORECASE | re.DOTALL)
+        action_match = _ACTION_RE.search(response)
         if action_match:
             action = action_match.group(1).strip()
             action_input = action_match.group(2).strip()
         else:
             # Try simpler pattern
-            action_match = re.search(r"ACTION:\s*(\w+)", response, re.IGNORECASE)
+            action_match = _ACTION_NAME_RE.search(response)
             if action_match:
                 action = action_match.group(1).strip()
                 # Get everything after action name
@@ -545,7 +577,7 @@ Format it professionally with headings and sections."""
     async def _action_search(self, query: str, context: AgentContext) -> str:
         """Execute SEARCH action using RAG."""
         try:
-            results = await self.rag.search(
+            results = await self.search_rag_results(
                 query=query,
                 domain=context.domain,
                 n_results=3
@@ -562,7 +594,7 @@ Format it professionally with headings and sections."""
         """Execute GENERATE action to create ACTUAL content (not plans)."""
         
         # Get task type from context
-        query_lower = context.query.lower()
+        query_lower = context.query_lower
         is_course = any(w in query_lower for w in ['course', 'curriculum', 'lesson', 'module', 'training', 'tutorial'])
         is_analysis = any(w in query_lower for w in ['analysis', 'analyze', 'compare', 'evaluate', 'assess'])
         is_guide = any(w in query_lower for w in ['guide', 'how to', 'steps', 'process', 'procedure'])
@@ -619,13 +651,12 @@ Include examples, explanations, and actionable information.
 
 Generate the complete content:"""
         
-        result = ""
-        async for chunk in self.llm.generate_stream(
+        result = await self.collect_llm(
+            context.session_id,
             prompt=prompt,
             temperature=0.7,
             max_tokens=4000
-        ):
-            result += chunk
+        )
         
         # Store full generated content for later use
         if "generated_content" not in context.metadata:
@@ -646,12 +677,11 @@ Provide a brief analysis considering:
 
 Analysis:"""
         
-        result = ""
-        async for chunk in self.llm.generate_stream(
+        result = await self.collect_llm(
+            context.session_id,
             prompt=prompt,
             temperature=0.5
-        ):
-            result += chunk
+        )
         
         return f"Analysis:\n{result[:400]}..."
     
@@ -677,15 +707,14 @@ Analysis:"""
         template_id = reasoning_plan.get("template_id", str(uuid.uuid4()))
         
         # Ensure Instructional Designer is always included
-        if "Instructional Designer" not in domain_skills:
-            domain_skills = ["Instructional Designer"] + domain_skills
+        domain_skills = self._lead_with_instructional_designer(domain_skills)
         
         prompt = f"""Build a complete domain template for: {instruction}
 
 Domain: {detected_domain}
 Template ID: {template_id}
-Required Skills: {json.dumps(domain_skills)}
-Capability Keys: {json.dumps(domain_capabilities)}
+Required Skills: {orjson.dumps(domain_skills).decode()}
+Capability Keys: {orjson.dumps(domain_capabilities).decode()}
 
 Generate a complete template JSON with:
 1. All metadata (created_at, generated_by, session_id)
@@ -695,12 +724,12 @@ Generate a complete template JSON with:
 
 Output ONLY valid JSON:"""
         
-        result = ""
-        async for chunk in self.llm.generate_stream(
+        result = await self.collect_llm(
+            context.session_id,
             prompt=prompt,
-            temperature=0.7
-        ):
-            result += chunk
+            temperature=0.7,
+            json_close="}"
+        )
         
         # Store the template in context metadata
         if "domain_template" not in context.metadata:
@@ -708,13 +737,13 @@ Output ONLY valid JSON:"""
         
         # Try to parse and validate the JSON
         try:
-            json_match = re.search(r'\{[\s\S]*\}', result)
-            if json_match:
-                template_json = json.loads(json_match.group())
+            json_text = _outer_json(result)
+            if json_text:
+                template_json = orjson.loads(json_text)
                 context.metadata["domain_template"] = template_json
                 context.metadata["template_valid"] = True
-                return f"Template built successfully:\n{json.dumps(template_json, indent=2)[:1000]}..."
-        except json.JSONDecodeError:
+                return f"Template built successfully:\n{orjson.dumps(template_json, option=orjson.OPT_INDENT_2).decode()[:1000]}..."
+        except orjson.JSONDecodeError:
             context.metadata["template_valid"] = False
             pass
         
@@ -738,38 +767,34 @@ Instruction: {instruction}
 
 MANDATORY: The first skill MUST be "Instructional Designer"
 
-Base skills to include: {json.dumps(base_skills)}
+Base skills to include: {orjson.dumps(base_skills).decode()}
 
 Generate 5-8 domain-specific skills. Output as JSON array:"""
         
-        result = ""
-        async for chunk in self.llm.generate_stream(
+        result = await self.collect_llm(
+            context.session_id,
             prompt=prompt,
-            temperature=0.7
-        ):
-            result += chunk
+            temperature=0.7,
+            json_close="]"
+        )
         
         # Try to parse skills array
         try:
-            json_match = re.search(r'\[[\s\S]*\]', result)
-            if json_match:
-                skills = json.loads(json_match.group())
+            json_text = _outer_json(result, "[", "]")
+            if json_text:
+                skills = orjson.loads(json_text)
                 # Ensure Instructional Designer is first
-                if "Instructional Designer" not in skills:
-                    skills = ["Instructional Designer"] + skills
-                elif skills[0] != "Instructional Designer":
-                    skills.remove("Instructional Designer")
-                    skills = ["Instructional Designer"] + skills
+                skills = self._lead_with_instructional_designer(skills)
                 
                 context.metadata["generated_skills"] = skills
-                return f"Skills generated:\n{json.dumps(skills, indent=2)}"
-        except json.JSONDecodeError:
+                return f"Skills generated:\n{orjson.dumps(skills, option=orjson.OPT_INDENT_2).decode()}"
+        except orjson.JSONDecodeError:
             pass
         
         # Fallback with base skills
-        skills = ["Instructional Designer"] + base_skills
+        skills = self._lead_with_instructional_designer(base_skills)
         context.metadata["generated_skills"] = skills
-        return f"Skills (using base):\n{json.dumps(skills, indent=2)}"
+        return f"Skills (using base):\n{orjson.dumps(skills, option=orjson.OPT_INDENT_2).decode()}"
     
     async def _action_generate_capabilities(self, instruction: str, context: AgentContext) -> str:
         """Execute GENERATE_CAPABILITIES action to create unique capability keys."""
@@ -781,7 +806,7 @@ Generate 5-8 domain-specific skills. Output as JSON array:"""
 
 Instruction: {instruction}
 
-Base capability keys: {json.dumps(base_capabilities)}
+Base capability keys: {orjson.dumps(base_capabilities).decode()}
 
 Requirements:
 1. Keys must be unique to this domain (no generic keys)
@@ -791,27 +816,27 @@ Requirements:
 
 Output as JSON object with capability keys and descriptions:"""
         
-        result = ""
-        async for chunk in self.llm.generate_stream(
+        result = await self.collect_llm(
+            context.session_id,
             prompt=prompt,
-            temperature=0.7
-        ):
-            result += chunk
+            temperature=0.7,
+            json_close="}"
+        )
         
         # Try to parse capabilities object
         try:
-            json_match = re.search(r'\{[\s\S]*\}', result)
-            if json_match:
-                capabilities = json.loads(json_match.group())
+            json_text = _outer_json(result)
+            if json_text:
+                capabilities = orjson.loads(json_text)
                 context.metadata["generated_capabilities"] = capabilities
-                return f"Capabilities generated:\n{json.dumps(capabilities, indent=2)}"
-        except json.JSONDecodeError:
+                return f"Capabilities generated:\n{orjson.dumps(capabilities, option=orjson.OPT_INDENT_2).decode()}"
+        except orjson.JSONDecodeError:
             pass
         
         # Fallback with base capabilities as object
         capabilities = {cap: f"Domain-specific {cap} for {detected_domain}" for cap in base_capabilities}
         context.metadata["generated_capabilities"] = capabilities
-        return f"Capabilities (using base):\n{json.dumps(capabilities, indent=2)}"
+        return f"Capabilities (using base):\n{orjson.dumps(capabilities, option=orjson.OPT_INDENT_2).decode()}"
     
     async def _generate_fallback_response(self, context: AgentContext) -> str:
         """Generate a direct response when ReAct loop doesn't produce output."""
@@ -836,12 +861,11 @@ Output as JSON object with capability keys and descriptions:"""
 
 Generate your response:"""
         
-        result = ""
-        async for chunk in self.llm.generate_stream(
+        result = await self.collect_llm(
+            context.session_id,
             prompt=prompt,
             temperature=0.7
-        ):
-            result += chunk
+        )
         
         return result
     
@@ -850,14 +874,8 @@ Generate your response:"""
         scenes = []
         
         # Look for numbered sections
-        patterns = [
-            r"(?:Scene|Section|Part|Step)\s*(\d+)[:\s]+([^\n]+)",
-            r"(\d+)\.\s+\*\*([^\*]+)\*\*",
-            r"###\s*(\d+)[.:\s]+(.+)"
-        ]
-        
-        for pattern in patterns:
-            matches = re.findall(pattern, content, re.IGNORECASE)
+        for pattern in _SCENE_HEADING_PATTERNS:
+            matches = pattern.findall(content)
             if matches:
                 for num, title in matches[:10]:
                     scenes.append(Scene(
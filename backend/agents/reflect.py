@@ -28,7 +28,7 @@ Strengths: Huge improvement in output quality
 Weaknesses: Extra cost + latency (two forward passes)
 """
 
-from typing import AsyncGenerator, Optional, Dict, Any, List
+from typing import AsyncGenerator, Optional, Dict, Any, List, Tuple
 import json
 import re
 import uuid
@@ -38,6 +38,42 @@ from .base import BaseAgent, AgentContext
 from models.schemas import AgentEvent, AgentName, AgentEventType, Storyboard, Scene
 from config import settings
 
+# Numbered-section markers for pulling scenes out of free-form content.
+# A marker without the trailing separator still ends the previous section.
+_SCENE_SECTION_MARKERS = (
+    re.compile(r"(?:##|###)\s*(\d+)([.:\s]+)?"),
+    re.compile(r"(?:Scene|Section|Part)\s*(\d+)([:\s]+)?", re.IGNORECASE),
+)
+
+
+def _split_sections(content: str, marker: "re.Pattern[str]", limit: int = 10) -> List[Tuple[str, str]]:
+    """
+    Split content into numbered sections in one forward pass.
+    
+    Each section runs from the end of its marker to the start of the next
+    marker (or the end of the content), so no lazy match has to be
+    re-extended character by character.
+    
+    Args:
+        content: Text to split
+        marker: Compiled section marker (number in group 1, separator in group 2)
+        limit: Maximum number of sections to return
+        
+    Returns:
+        List of (section number, section text) tuples
+    """
+    sections = []
+    number, start = None, None
+    for match in marker.finditer(content):
+        if start is not None and match.start() > start:
+            sections.append((number, content[start:match.start()]))
+            if len(sections) >= limit:
+                return sections
+        number, start = (match.group(1), match.end()) if match.group(2) else (None, None)
+    if start is not None and start < len(content):
+        sections.append((number, content[start:]))
+    return sections
+
 
 class ReFlectAgent(BaseAgent):
     """
@@ -389,12 +425,11 @@ When critiquing, also consider:
             query=context.query
         ) + critique_context
         
-        critique = ""
-        async for chunk in self.llm.generate_stream(
+        critique = await self.collect_llm(
+            context.session_id,
             prompt=critique_prompt,
             temperature=0.3  # Lower temp for analytical task
-        ):
-            critique += chunk
+        )
         
         # Parse critique scores
         scores = self._parse_critique_scores(critique)
@@ -441,12 +476,11 @@ When critiquing, also consider:
                 critique=critique[:1500]
             )
             
-            improved = ""
-            async for chunk in self.llm.generate_stream(
+            improved = await self.collect_llm(
+                context.session_id,
                 prompt=improve_prompt,
                 temperature=0.7
-            ):
-                improved += chunk
+            )
             
             if improved and len(improved) > len(react_output) * 0.5:
                 final_output = improved
@@ -632,15 +666,10 @@ When critiquing, also consider:
         
         # If no scenes, try to extract from content
         if not scenes:
-            patterns = [
-                r"(?:##|###)\s*(\d+)[.:\s]+(.+?)(?=(?:##|###)\s*\d+|$)",
-                r"(?:Scene|Section|Part)\s*(\d+)[:\s]+(.+?)(?=(?:Scene|Section|Part)\s*\d+|$)"
-            ]
-            
-            for pattern in patterns:
-                matches = re.findall(pattern, content, re.IGNORECASE | re.DOTALL)
+            for marker in _SCENE_SECTION_MARKERS:
+                matches = _split_sections(content, marker)
                 if matches:
-                    for num, text in matches[:10]:
+                    for num, text in matches:
                         title = text.split('\n')[0].strip()[:100]
                         desc = text[:500] if len(text) > 100 else text
                         scenes.append(Scene(
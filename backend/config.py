@@ -19,6 +19,9 @@ class Settings(BaseSettings):
     openai_temperature: float = Field(default=0.7, env="OPENAI_TEMPERATURE")
     openai_max_tokens: int = Field(default=30000, env="OPENAI_MAX_TOKENS")
     openai_embedding_model: str = Field(default="text-embedding-3-small", env="OPENAI_EMBEDDING_MODEL")
+    llm_max_concurrency: int = Field(default=8, env="LLM_MAX_CONCURRENCY")  # Max in-flight LLM/embedding requests
+    llm_request_timeout: float = Field(default=600.0, env="LLM_REQUEST_TIMEOUT")  # Seconds per LLM/embedding request
+    llm_connect_timeout: float = Field(default=10.0, env="LLM_CONNECT_TIMEOUT")  # Seconds to open a connection
     
     # MongoDB Configuration
     mongodb_uri: str = Field(default="mongodb://localhost:27017", env="MONGODB_URI")
@@ -28,6 +31,8 @@ class Settings(BaseSettings):
     chromadb_persist_dir: str = Field(default="./chroma_data", env="CHROMADB_PERSIST_DIR")
     chromadb_rag_collection: str = Field(default="rag_documents", env="CHROMADB_RAG_COLLECTION")
     chromadb_tme_collection: str = Field(default="tme_memories", env="CHROMADB_TME_COLLECTION")
+    rag_cache_ttl_seconds: int = Field(default=300, env="RAG_CACHE_TTL_SECONDS")
+    rag_cache_max_entries: int = Field(default=1024, env="RAG_CACHE_MAX_ENTRIES")
     
     # WebSocket Configuration
     ws_heartbeat_interval: int = Field(default=30, env="WS_HEARTBEAT_INTERVAL")
@@ -48,6 +53,11 @@ class Settings(BaseSettings):
     preact_max_scenes: int = Field(default=10, env="PREACT_MAX_SCENES")
     react_max_iterations: int = Field(default=20, env="REACT_MAX_ITERATIONS")  # Increased to allow completing full plans
     reflect_revision_rounds: int = Field(default=2, env="REFLECT_REVISION_ROUNDS")
+    preact_plan_cache_enabled: bool = Field(default=False, env="PREACT_PLAN_CACHE_ENABLED")  # Reuse plans for similar queries
+    preact_plan_cache_threshold: float = Field(default=0.90, env="PREACT_PLAN_CACHE_THRESHOLD")  # Min cosine similarity
+    preact_plan_cache_max_entries: int = Field(default=64, env="PREACT_PLAN_CACHE_MAX_ENTRIES")  # Per domain/skill level
+    preact_json_mode: bool = Field(default=False, env="PREACT_JSON_MODE")  # Request JSON-only plan output (endpoint must support it)
+    preact_trivial_fast_path: bool = Field(default=False, env="PREACT_TRIVIAL_FAST_PATH")  # Default plan for short simple queries
     
     class Config:
         env_file = ".env"
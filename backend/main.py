@@ -15,15 +15,17 @@ from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Requ
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+import orjson
 
 from config import settings
 from models.schemas import (
     AgentRequest, AgentEvent, AgentEventType, AgentName,
-    Storyboard, SessionInfo, MasterPlan
+    Storyboard, SessionInfo, MasterPlan, orjson_default
 )
-from agents import PreActAgent, ReActAgent, ReFlectAgent, AgentContext
+from agents import BaseAgent, PreActAgent, ReActAgent, ReFlectAgent, AgentContext
 from storage.mongodb import get_mongodb_service
 from rag.retriever import get_rag_service
+from services.llm import get_llm_service
 from prompts.dynamic_prompt_builder import get_prompt_builder
 
 
@@ -58,12 +60,19 @@ def serialize_for_json(obj):
     return obj
 
 
+# Pre-encoded SSE frame pieces
+SSE_EVENT_PREFIX = b"event: "
+SSE_DATA_PREFIX = b"\ndata: "
+SSE_EVENT_SUFFIX = b"\n\n"
+
 # Store active WebSocket connections
 active_connections: Dict[str, WebSocket] = {}
 # Store SSE connections
 sse_connections: Dict[str, asyncio.Queue] = {}
 # Store running tasks
 running_tasks: Dict[str, asyncio.Task] = {}
+# Event history writes still in flight (held so they are not garbage collected)
+pending_event_writes: Set[asyncio.Task] = set()
 # Store pending plans awaiting approval (in-memory cache)
 pending_plans: Dict[str, Dict] = {}
 
@@ -119,10 +128,10 @@ async def lifespan(app: FastAPI):
     """Application lifespan manager."""
     print(f"Starting {settings.app_name} v{settings.app_version}")
     
-    # Initialize RAG with domain content
-    rag_service = get_rag_service()
-    await rag_service.initialize_domain_content()
-    print("RAG service initialized with domain content")
+    # Warm shared agent services off the request path (also seeds RAG
+    # with the domain content)
+    await BaseAgent.preload()
+    print("Agent services preloaded, RAG initialized with domain content")
     
     # Connect to MongoDB
     mongodb = await get_mongodb_service()
@@ -134,6 +143,8 @@ async def lifespan(app: FastAPI):
     print("Shutting down...")
     for task in running_tasks.values():
         task.cancel()
+    if pending_event_writes:
+        await asyncio.gather(*pending_event_writes, return_exceptions=True)
     if mongodb:
         await mongodb.disconnect()
 
@@ -219,7 +230,8 @@ async def health_check():
     return {
         "status": "healthy",
         "service": settings.app_name,
-        "version": settings.app_version
+        "version": settings.app_version,
+        "llm_streams_in_flight": get_llm_service().num_unfinished_requests
     }
 
 
@@ -744,9 +756,17 @@ async def emit_event(queue: Optional[asyncio.Queue], session_id: str, event: Age
         except:
             pass
     
-    # Store event in MongoDB
-    mongodb = await get_mongodb_service()
+    # Store event in MongoDB in the background so the agent loop is not
+    # held up by a database round trip per event
+    task = asyncio.create_task(store_event(session_id, event))
+    pending_event_writes.add(task)
+    task.add_done_callback(pending_event_writes.discard)
+
+
+async def store_event(session_id: str, event: AgentEvent):
+    """Persist an emitted event to the session's chat history."""
     try:
+        mongodb = await get_mongodb_service()
         await mongodb.add_agent_event(
             session_id=session_id,
             event=event
@@ -795,9 +815,12 @@ async def events_stream(session_id: str, request: Request):
                     events_sent += 1
                     print(f"[SSE] Sending event {events_sent}: {event_type} for session {session_id}")
                     
-                    # Serialize event data to handle datetime and other special types
-                    serialized_event = serialize_for_json(event)
-                    yield f"event: {event_type}\ndata: {json.dumps(serialized_event)}\n\n"
+                    # Serialize event data straight to bytes (orjson handles datetime natively)
+                    yield (
+                        SSE_EVENT_PREFIX + event_type.encode() + SSE_DATA_PREFIX
+                        + orjson.dumps(event, default=orjson_default, option=orjson.OPT_NON_STR_KEYS)
+                        + SSE_EVENT_SUFFIX
+                    )
                     
                     # Only end stream on SYSTEM complete/error (not individual agent complete events)
                     # This allows ReAct to complete and ReFlect to still run
@@ -120,7 +120,8 @@ class TaskMemoryEngine:
         query: str,
         n_results: int = 5,
         memory_type: Optional[str] = None,
-        tags: Optional[List[str]] = None
+        tags: Optional[List[str]] = None,
+        query_embedding: Optional[List[float]] = None
     ) -> List[MemoryEntry]:
         """
         Query memories using semantic search.
@@ -131,6 +132,7 @@ class TaskMemoryEngine:
             n_results: Number of results to return
             memory_type: Filter by memory type
             tags: Filter by tags
+            query_embedding: Precomputed embedding of query (skips embedding)
             
         Returns:
             List[MemoryEntry]: Matching memory entries
@@ -142,7 +144,8 @@ class TaskMemoryEngine:
             where_clause["memory_type"] = memory_type
         
         # Get query embedding
-        query_embedding = await self.llm_service.get_embedding(query)
+        if not query_embedding:
+            query_embedding = await self.llm_service.get_embedding(query)
         
         if not query_embedding:
             # Fall back to text search if embedding fails
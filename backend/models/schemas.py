@@ -6,10 +6,20 @@ Defines all data models for agents, events, scenes, and storage.
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime
-from enum import Enum
+from decimal import Decimal
+from enum import Enum, StrEnum
 import uuid
 
 
+def orjson_default(obj: Any) -> Any:
+    """Fallback serializer for types orjson does not handle natively."""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if hasattr(obj, 'model_dump'):  # Pydantic model
+        return obj.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
 class AgentName(str, Enum):
     """Names of available agents in the pipeline."""
     PREACT = "preAct"
@@ -20,7 +30,7 @@ class AgentName(str, Enum):
     SYSTEM = "system"
 
 
-class AgentEventType(str, Enum):
+class AgentEventType(StrEnum):
     """Types of events that agents can emit."""
     THOUGHT = "thought"
     ACTION = "action"
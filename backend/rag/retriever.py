@@ -54,6 +54,9 @@ class RAGRetriever:
         
         self._llm_service = None
         self._initialized = False
+        
+        # Bumped on every add, so cached search results can be invalidated
+        self.revision = 0
     
     @property
     def llm_service(self):
@@ -253,6 +256,7 @@ class RAGRetriever:
             documents=[content],
             metadatas=[doc_metadata]
         )
+        self.revision += 1
         
         return doc_id
     
@@ -260,7 +264,8 @@ class RAGRetriever:
         self,
         query: str,
         domain: Optional[str] = None,
-        n_results: int = 5
+        n_results: int = 5,
+        query_embedding: Optional[List[float]] = None
     ) -> List[RAGResult]:
         """
         Search for relevant documents.
@@ -269,6 +274,7 @@ class RAGRetriever:
             query: Search query
             domain: Optional domain filter
             n_results: Number of results to return
+            query_embedding: Precomputed embedding of query (skips embedding)
             
         Returns:
             List[RAGResult]: Matching documents with relevance scores
@@ -279,7 +285,8 @@ class RAGRetriever:
             where_clause = {"domain": domain}
         
         # Get query embedding
-        query_embedding = await self.llm_service.get_embedding(query)
+        if not query_embedding:
+            query_embedding = await self.llm_service.get_embedding(query)
         
         if not query_embedding:
             # Fall back to text search
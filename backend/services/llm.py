@@ -3,8 +3,9 @@ OpenAI LLM wrapper service with async streaming support.
 Provides a unified interface for text generation and embeddings.
 """
 
-from typing import AsyncGenerator, Optional, List, Dict, Any
-from openai import AsyncOpenAI
+from typing import AsyncGenerator, Optional, List, Dict, Any, Set
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+import httpx
 import asyncio
 from functools import lru_cache
 
@@ -27,7 +28,8 @@ class LLMService:
         model: Optional[str] = None,
         temperature: Optional[float] = None,
         max_tokens: Optional[int] = None,
-        embedding_model: Optional[str] = None
+        embedding_model: Optional[str] = None,
+        max_concurrency: Optional[int] = None
     ):
         """
         Initialize the LLM service.
@@ -38,6 +40,7 @@ class LLMService:
             temperature: Generation temperature (defaults to settings)
             max_tokens: Maximum tokens (defaults to settings)
             embedding_model: Embedding model (defaults to settings)
+            max_concurrency: Max in-flight requests (defaults to settings)
         """
         self.api_key = api_key or settings.openai_api_key
         self.model = model or settings.openai_model
@@ -45,6 +48,15 @@ class LLMService:
         self.max_tokens = max_tokens or settings.openai_max_tokens
         self.embedding_model = embedding_model or settings.openai_embedding_model
         
+        # Shared in-flight budget for every agent using this service
+        self.max_concurrency = max_concurrency or settings.llm_max_concurrency
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        # Open streams by request ID, so callers can abort them
+        self._inflight: Dict[str, Any] = {}
+        # Request IDs closed through abort(), whose errors nobody will read
+        self._aborted: Set[str] = set()
+        
         # Use configured base URL
         self.base_url = settings.openai_base_url
         
@@ -54,9 +66,21 @@ class LLMService:
         else:
             print(f"LLM Service initialized: model={self.model}, base_url={self.base_url}, api_key={self.api_key[:15]}***")
         
+        # One keep-alive pool sized to the concurrency budget, so requests
+        # reuse warm TCP/TLS connections instead of reconnecting
         self.client = AsyncOpenAI(
             api_key=self.api_key,
-            base_url=self.base_url
+            base_url=self.base_url,
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency * 2,
+                    max_keepalive_connections=self.max_concurrency
+                ),
+                timeout=httpx.Timeout(
+                    settings.llm_request_timeout,
+                    connect=settings.llm_connect_timeout
+                )
+            )
         )
 
     async def generate_stream(
@@ -65,7 +89,9 @@ class LLMService:
         system_prompt: Optional[str] = None,
         temperature: Optional[float] = None,
         max_tokens: Optional[int] = None,
-        stop_sequences: Optional[List[str]] = None
+        stop_sequences: Optional[List[str]] = None,
+        request_id: Optional[str] = None,
+        response_format: Optional[Dict[str, Any]] = None
     ) -> AsyncGenerator[str, None]:
         """
         Generate text with streaming output.
@@ -76,6 +102,8 @@ class LLMService:
             temperature: Override default temperature
             max_tokens: Override default max tokens
             stop_sequences: Stop sequences
+            request_id: Optional ID that can be passed to abort()
+            response_format: Response format (e.g., {"type": "json_object"})
             
         Yields:
             str: Text chunks as they are generated
@@ -87,22 +115,64 @@ class LLMService:
         
         messages.append({"role": "user", "content": prompt})
         
+        kwargs = {}
+        if response_format:
+            kwargs["response_format"] = response_format
+        
+        stream = None
         try:
-            stream = await self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=temperature if temperature is not None else self.temperature,
-                max_tokens=max_tokens or self.max_tokens,
-                stop=stop_sequences,
-                stream=True
-            )
-            
-            async for chunk in stream:
-                if chunk.choices[0].delta.content:
-                    yield chunk.choices[0].delta.content
+            async with self._semaphore:
+                stream = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature if temperature is not None else self.temperature,
+                    max_tokens=max_tokens or self.max_tokens,
+                    stop=stop_sequences,
+                    stream=True,
+                    **kwargs
+                )
+                if request_id:
+                    self._inflight[request_id] = stream
+                
+                async for chunk in stream:
+                    if chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
                     
         except Exception as e:
-            yield f"[Error: {str(e)}]"
+            # An aborted stream has no one left to read the error
+            if request_id not in self._aborted:
+                yield f"[Error: {str(e)}]"
+        finally:
+            if request_id:
+                self._inflight.pop(request_id, None)
+                self._aborted.discard(request_id)
+            if stream is not None:
+                await stream.close()
+    
+    async def abort(self, request_id: str) -> bool:
+        """
+        Abort an in-flight streaming generation.
+        
+        Closing the HTTP stream lets the serving engine stop generating
+        tokens for a client that has gone away.
+        
+        Args:
+            request_id: ID passed to generate_stream
+            
+        Returns:
+            bool: True if a stream was open and has been closed
+        """
+        stream = self._inflight.pop(request_id, None)
+        if stream is None:
+            return False
+        self._aborted.add(request_id)
+        await stream.close()
+        return True
+    
+    @property
+    def num_unfinished_requests(self) -> int:
+        """Number of streaming generations currently in flight."""
+        return len(self._inflight)
     
     async def generate(
         self,
@@ -148,7 +218,8 @@ class LLMService:
             kwargs["response_format"] = response_format
         
         try:
-            response = await self.client.chat.completions.create(**kwargs)
+            async with self._semaphore:
+                response = await self.client.chat.completions.create(**kwargs)
             return response.choices[0].message.content or ""
         except Exception as e:
             return f"[Error: {str(e)}]"
@@ -180,12 +251,13 @@ class LLMService:
         full_messages.extend(messages)
         
         try:
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=full_messages,
-                temperature=temperature if temperature is not None else self.temperature,
-                max_tokens=max_tokens or self.max_tokens
-            )
+            async with self._semaphore:
+                response = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=full_messages,
+                    temperature=temperature if temperature is not None else self.temperature,
+                    max_tokens=max_tokens or self.max_tokens
+                )
             return response.choices[0].message.content or ""
         except Exception as e:
             return f"[Error: {str(e)}]"
@@ -201,10 +273,11 @@ class LLMService:
             List[float]: Embedding vector
         """
         try:
-            response = await self.client.embeddings.create(
-                model=self.embedding_model,
-                input=text
-            )
+            async with self._semaphore:
+                response = await self.client.embeddings.create(
+                    model=self.embedding_model,
+                    input=text
+                )
             return response.data[0].embedding
         except Exception as e:
             # Return empty vector on error
@@ -221,10 +294,11 @@ class LLMService:
             List[List[float]]: List of embedding vectors
         """
         try:
-            response = await self.client.embeddings.create(
-                model=self.embedding_model,
-                input=texts
-            )
+            async with self._semaphore:
+                response = await self.client.embeddings.create(
+                    model=self.embedding_model,
+                    input=texts
+                )
             return [item.embedding for item in response.data]
         except Exception as e:
             # Return empty vectors on error